@@ -0,0 +1,27 @@
+"""Index photos.filename for orphan-file garbage collection
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Tables are created by Base.metadata.create_all on startup, which only
+    # adds indexes to new tables; existing databases need this one added.
+    op.create_index('ix_photos_filename', 'photos', ['filename'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_photos_filename', table_name='photos')
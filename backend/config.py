@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
+from typing import Optional
 import os
 
 # Find .env file - check backend folder first, then parent folder
@@ -18,6 +19,7 @@ def find_env_file():
 class Settings(BaseSettings):
     # Anthropic
     anthropic_api_key: str
+    anthropic_base_url: Optional[str] = None  # Override to point at a local/fake API
 
     # Clerk
     clerk_secret_key: str
@@ -30,6 +32,12 @@ class Settings(BaseSettings):
     backend_url: str = "http://localhost:8000"
     cors_origins: str = "http://localhost:5173"
 
+    # Responses smaller than this (in bytes) are sent uncompressed
+    gzip_minimum_size: int = 1000
+    # Level 4 gets within ~6% of level 9's size at about a quarter of the CPU
+    # on analysis payloads (see scripts/benchmark_serialization.py)
+    gzip_compresslevel: int = 4
+
     model_config = SettingsConfigDict(
         env_file=find_env_file(),
         env_file_encoding="utf-8",
@@ -1,5 +1,9 @@
-from sqlalchemy import create_engine
+import asyncio
+import zlib
+from contextlib import asynccontextmanager
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.dialects import postgresql, sqlite
 from config import get_settings
 
 settings = get_settings()
@@ -18,3 +22,44 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def upsert(model):
+    """
+    Dialect-specific INSERT supporting on_conflict_do_update/do_nothing.
+    Only PostgreSQL and SQLite are supported.
+    """
+    if engine.dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
+@asynccontextmanager
+async def advisory_lock(key: str, poll_interval: float = 0.1):
+    """
+    Check out one connection and, on PostgreSQL, hold a session advisory lock
+    for key on it while the block runs. Yields the connection so callers can
+    do their database work on it instead of checking out a second one.
+
+    Other databases get no cross-process lock: with SQLite and several
+    workers, concurrent writers are only kept consistent by ON CONFLICT upserts.
+    """
+    with engine.connect() as conn:
+        if engine.dialect.name != "postgresql":
+            yield conn
+            return
+
+        lock_id = zlib.crc32(key.encode("utf-8"))
+        # Poll with try-lock so waiting never blocks the event loop. Commit
+        # after each attempt so the connection never idles in a transaction;
+        # the session-level lock survives commits.
+        while not conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": lock_id}).scalar():
+            conn.commit()
+            await asyncio.sleep(poll_interval)
+        conn.commit()
+        try:
+            yield conn
+        finally:
+            conn.rollback()
+            conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": lock_id})
+            conn.commit()
@@ -1,6 +1,7 @@
 import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 from config import get_settings
@@ -14,6 +15,23 @@ UPLOADS_DIR = os.path.join(os.path.dirname(__file__), "uploads")
 os.makedirs(UPLOADS_DIR, exist_ok=True)
 
 
+class APIGZipMiddleware:
+    """
+    GZip responses except those from the /uploads mount. Images are already
+    compressed, and gzipping them drops Content-Length and breaks Range requests.
+    """
+
+    def __init__(self, app, minimum_size: int, compresslevel: int):
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=compresslevel)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and not scope["path"].startswith("/uploads"):
+            await self.gzip(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Create database tables on startup
@@ -38,6 +56,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large JSON payloads (photo lists carry multi-KB analyses)
+app.add_middleware(
+    APIGZipMiddleware,
+    minimum_size=settings.gzip_minimum_size,
+    compresslevel=settings.gzip_compresslevel,
+)
+
 # Serve uploaded files
 app.mount("/uploads", StaticFiles(directory=UPLOADS_DIR), name="uploads")
 
@@ -24,7 +24,7 @@ class Photo(Base):
 
     id = Column(String(36), primary_key=True, default=generate_uuid)
     user_id = Column(String(255), ForeignKey("users.id"), nullable=False)
-    filename = Column(String(255), nullable=False)
+    filename = Column(String(255), nullable=False, index=True)
     original_filename = Column(String(255), nullable=False)
     storage_url = Column(Text, nullable=False)
     file_size = Column(Integer, nullable=True)
@@ -48,3 +48,30 @@ class Analysis(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     photo = relationship("Photo", back_populates="analysis")
+
+
+class FileDeletion(Base):
+    # Tombstone for an upload whose photo row is already gone. A deleted_at
+    # column on photos would work too, but every photo query would then need
+    # a "not deleted" filter; keeping pending deletions in their own table
+    # leaves those queries untouched.
+    __tablename__ = "file_deletions"
+
+    id = Column(String(36), primary_key=True, default=generate_uuid)
+    filename = Column(String(255), nullable=False)  # Path relative to the uploads directory
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class AnalysisUsage(Base):
+    __tablename__ = "analysis_usage"
+
+    id = Column(String(36), primary_key=True, default=generate_uuid)
+    photo_id = Column(String(36), nullable=False, index=True)  # Not a FK: usage outlives deleted photos
+    model = Column(String(100), nullable=False)
+    input_tokens = Column(Integer, nullable=False, default=0)  # Uncached input tokens
+    output_tokens = Column(Integer, nullable=False, default=0)
+    cache_creation_input_tokens = Column(Integer, nullable=False, default=0)  # Tokens written to prompt cache
+    cache_read_input_tokens = Column(Integer, nullable=False, default=0)  # Tokens served from prompt cache
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
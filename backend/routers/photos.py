@@ -1,42 +1,62 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Form
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import Optional
-from database import get_db
-from models import User, Photo, Analysis
+from database import advisory_lock, get_db, upsert
+from models import User, Photo, Analysis, AnalysisUsage, FileDeletion
+from schemas import (
+    AnalysisResponse,
+    BatchAnalysisResponse,
+    MessageResponse,
+    PhotoDetailResponse,
+    PhotoListResponse,
+    UploadResponse,
+)
 from services.auth_service import get_current_user
 from services.storage_service import storage_service
-from services.claude_service import claude_service
-from pydantic import BaseModel
+from services.claude_service import IncompleteAnalysisError, claude_service
+from services.single_flight import SingleFlight
 
-router = APIRouter(prefix="/photos", tags=["photos"])
+# Handlers return plain dicts under a typed response_model, so FastAPI validates
+# and serializes them once through pydantic-core (skipping jsonable_encoder)
+# and renders with orjson.
+router = APIRouter(
+    prefix="/photos",
+    tags=["photos"],
+    default_response_class=ORJSONResponse,
+)
 
+_analysis_flight = SingleFlight()
 
-class PhotoResponse(BaseModel):
-    id: str
-    filename: str
-    original_filename: str
-    storage_url: str
-    file_size: Optional[int]
-    created_at: str
-    analysis: Optional[dict] = None
 
-    class Config:
-        from_attributes = True
+def _analysis_response(analysis: Analysis) -> dict:
+    return {
+        "id": analysis.id,
+        "photo_id": analysis.photo_id,
+        "location_info": analysis.location_info,
+        "historical_context": analysis.historical_context,
+        "user_context": analysis.user_context,
+        "full_response": analysis.full_response,
+    }
 
 
-class AnalysisResponse(BaseModel):
-    id: str
-    photo_id: str
-    location_info: Optional[str]
-    historical_context: Optional[str]
-    user_context: Optional[str]
-    created_at: str
+def _record_usage(db: Session, photo_id: str, usage: dict):
+    db.add(AnalysisUsage(photo_id=photo_id, model=claude_service.model, **usage))
 
-    class Config:
-        from_attributes = True
 
+def _photo_fields(photo: Photo) -> dict:
+    return {
+        "id": photo.id,
+        "filename": photo.filename,
+        "original_filename": photo.original_filename,
+        "storage_url": photo.storage_url,
+        "file_size": photo.file_size,
+        "created_at": photo.created_at.isoformat() if photo.created_at else None,
+    }
 
-@router.post("/upload")
+
+@router.post("/upload", response_model=UploadResponse)
 async def upload_photos(
     files: list[UploadFile] = File(...),
     context: Optional[str] = Form(None),
@@ -81,7 +101,7 @@ async def upload_photos(
     return {"photos": uploaded_photos, "count": len(uploaded_photos)}
 
 
-@router.post("/{photo_id}/analyze")
+@router.post("/{photo_id}/analyze", response_model=AnalysisResponse)
 async def analyze_photo(
     photo_id: str,
     context: Optional[str] = None,
@@ -99,54 +119,67 @@ async def analyze_photo(
         raise HTTPException(status_code=404, detail="Photo not found")
 
     # Check if analysis already exists
-    existing_analysis = db.query(Analysis).filter(Analysis.photo_id == photo_id).first()
-    if existing_analysis:
-        # Update with new context if provided
-        if context and context != existing_analysis.user_context:
-            analysis_result = await claude_service.analyze_photo(
-                photo.storage_url, context
+    analysis = db.query(Analysis).filter(Analysis.photo_id == photo_id).first()
+    if _needs_analysis(analysis, context):
+        # Concurrent requests for the same photo and context share one model call
+        storage_url = photo.storage_url
+        # Release the pooled connection while waiting so waiters can't starve the pool
+        db.close()
+        try:
+            return await _analysis_flight.do(
+                (photo_id, context),
+                lambda: _run_analysis(photo_id, storage_url, context),
             )
-            existing_analysis.user_context = context
-            existing_analysis.location_info = analysis_result["location_info"]
-            existing_analysis.historical_context = analysis_result["historical_context"]
-            existing_analysis.full_response = analysis_result["full_response"]
-            db.commit()
-            db.refresh(existing_analysis)
-        return {
-            "id": existing_analysis.id,
-            "photo_id": photo_id,
-            "location_info": existing_analysis.location_info,
-            "historical_context": existing_analysis.historical_context,
-            "user_context": existing_analysis.user_context,
-            "full_response": existing_analysis.full_response,
+        except IncompleteAnalysisError as e:
+            raise HTTPException(status_code=502, detail=f"Analysis failed: {e}")
+
+    return _analysis_response(analysis)
+
+
+def _needs_analysis(analysis: Optional[Analysis], context: Optional[str]) -> bool:
+    # Re-analyze an existing photo only when new context is provided
+    return analysis is None or bool(context and context != analysis.user_context)
+
+
+async def _run_analysis(
+    photo_id: str, storage_url: str, context: Optional[str]
+) -> dict:
+    """Analyze a photo and upsert the result, at most once across workers."""
+    # All database work runs on the lock's connection, so an analysis only
+    # ever holds one pooled connection
+    async with advisory_lock(f"analysis:{photo_id}") as conn:
+        # Another worker may have finished while we waited for the lock.
+        # Closing the session ends its transaction before the model call.
+        with Session(bind=conn) as db:
+            analysis = db.query(Analysis).filter(Analysis.photo_id == photo_id).first()
+            if not _needs_analysis(analysis, context):
+                return _analysis_response(analysis)
+
+        analysis_result = await claude_service.analyze_photo(storage_url, context)
+
+        values = {
+            "user_context": context,
+            "location_info": analysis_result["location_info"],
+            "historical_context": analysis_result["historical_context"],
+            "full_response": analysis_result["full_response"],
         }
+        with Session(bind=conn) as db:
+            db.execute(
+                upsert(Analysis)
+                .values(photo_id=photo_id, **values)
+                .on_conflict_do_update(
+                    index_elements=[Analysis.photo_id],
+                    set_={**values, "updated_at": func.now()},
+                )
+            )
+            _record_usage(db, photo_id, analysis_result["usage"])
+            db.commit()
 
-    # Perform analysis
-    analysis_result = await claude_service.analyze_photo(photo.storage_url, context)
-
-    # Save analysis
-    analysis = Analysis(
-        photo_id=photo_id,
-        user_context=context,
-        location_info=analysis_result["location_info"],
-        historical_context=analysis_result["historical_context"],
-        full_response=analysis_result["full_response"],
-    )
-    db.add(analysis)
-    db.commit()
-    db.refresh(analysis)
-
-    return {
-        "id": analysis.id,
-        "photo_id": photo_id,
-        "location_info": analysis.location_info,
-        "historical_context": analysis.historical_context,
-        "user_context": analysis.user_context,
-        "full_response": analysis.full_response,
-    }
+            analysis = db.query(Analysis).filter(Analysis.photo_id == photo_id).one()
+            return _analysis_response(analysis)
 
 
-@router.post("/analyze-batch")
+@router.post("/analyze-batch", response_model=BatchAnalysisResponse)
 async def analyze_batch(
     photo_ids: list[str],
     context: Optional[str] = None,
@@ -167,7 +200,7 @@ async def analyze_batch(
     return {"results": results}
 
 
-@router.get("/")
+@router.get("/", response_model=PhotoListResponse)
 async def list_photos(
     skip: int = 0,
     limit: int = 50,
@@ -186,28 +219,20 @@ async def list_photos(
 
     result = []
     for photo in photos:
-        photo_data = {
-            "id": photo.id,
-            "filename": photo.filename,
-            "original_filename": photo.original_filename,
-            "storage_url": photo.storage_url,
-            "file_size": photo.file_size,
-            "created_at": photo.created_at.isoformat() if photo.created_at else None,
-            "analysis": None,
-        }
+        analysis = None
         if photo.analysis:
-            photo_data["analysis"] = {
+            analysis = {
                 "id": photo.analysis.id,
                 "location_info": photo.analysis.location_info,
                 "historical_context": photo.analysis.historical_context,
                 "user_context": photo.analysis.user_context,
             }
-        result.append(photo_data)
+        result.append({**_photo_fields(photo), "analysis": analysis})
 
     return {"photos": result, "count": len(result)}
 
 
-@router.get("/{photo_id}")
+@router.get("/{photo_id}", response_model=PhotoDetailResponse)
 async def get_photo(
     photo_id: str,
     db: Session = Depends(get_db),
@@ -222,17 +247,9 @@ async def get_photo(
     if not photo:
         raise HTTPException(status_code=404, detail="Photo not found")
 
-    result = {
-        "id": photo.id,
-        "filename": photo.filename,
-        "original_filename": photo.original_filename,
-        "storage_url": photo.storage_url,
-        "file_size": photo.file_size,
-        "created_at": photo.created_at.isoformat() if photo.created_at else None,
-        "analysis": None,
-    }
+    analysis = None
     if photo.analysis:
-        result["analysis"] = {
+        analysis = {
             "id": photo.analysis.id,
             "location_info": photo.analysis.location_info,
             "historical_context": photo.analysis.historical_context,
@@ -240,12 +257,13 @@ async def get_photo(
             "full_response": photo.analysis.full_response,
         }
 
-    return result
+    return {**_photo_fields(photo), "analysis": analysis}
 
 
-@router.delete("/{photo_id}")
+@router.delete("/{photo_id}", response_model=MessageResponse)
 async def delete_photo(
     photo_id: str,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -258,11 +276,13 @@ async def delete_photo(
     if not photo:
         raise HTTPException(status_code=404, detail="Photo not found")
 
-    # Delete from storage
-    storage_service.delete_file(photo.filename)
-
-    # Delete from database (cascade will delete analysis)
+    # Queue the file for deletion in the same transaction as the row delete
+    # (cascade will delete analysis), then remove it after the response is sent
+    deletion = FileDeletion(filename=photo.filename)
+    db.add(deletion)
     db.delete(photo)
     db.commit()
 
+    background_tasks.add_task(storage_service.reclaim_deletions, [deletion.id])
+
     return {"message": "Photo deleted successfully"}
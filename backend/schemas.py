@@ -0,0 +1,59 @@
+from typing import Optional
+from pydantic import BaseModel
+
+
+class AnalysisSummary(BaseModel):
+    id: str
+    location_info: Optional[str]
+    historical_context: Optional[str]
+    user_context: Optional[str]
+
+
+class AnalysisDetail(AnalysisSummary):
+    full_response: Optional[str]
+
+
+class AnalysisResponse(AnalysisDetail):
+    photo_id: str
+
+
+class UploadedPhoto(BaseModel):
+    id: str
+    filename: str
+    original_filename: str
+    storage_url: str
+    file_size: Optional[int]
+
+
+class UploadResponse(BaseModel):
+    photos: list[UploadedPhoto]
+    count: int
+
+
+class PhotoResponse(UploadedPhoto):
+    created_at: Optional[str]
+    analysis: Optional[AnalysisSummary] = None
+
+
+class PhotoDetailResponse(PhotoResponse):
+    analysis: Optional[AnalysisDetail] = None
+
+
+class PhotoListResponse(BaseModel):
+    photos: list[PhotoResponse]
+    count: int
+
+
+class BatchAnalysisResult(BaseModel):
+    photo_id: str
+    success: bool
+    analysis: Optional[AnalysisResponse] = None
+    error: Optional[str] = None
+
+
+class BatchAnalysisResponse(BaseModel):
+    results: list[BatchAnalysisResult]
+
+
+class MessageResponse(BaseModel):
+    message: str
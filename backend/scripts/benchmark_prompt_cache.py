@@ -0,0 +1,89 @@
+"""
+Measure prompt-cache savings for photo analysis on a corpus of images.
+
+Analyzes every image in a directory with the production prompt and reports
+per-call token usage, including prompt cache writes and reads, followed by
+the input-token cost relative to the same calls without caching.
+
+Note: the cache only engages once the cached prefix (tool definition plus
+system prompt) reaches the model's minimum cacheable length (1024 tokens for
+claude-sonnet-4). The current prefix is shorter, so expect a warning that no
+cache writes or reads happened.
+
+Run from the backend directory:
+    python scripts/benchmark_prompt_cache.py path/to/images [--limit 20]
+"""
+import argparse
+import base64
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.claude_service import claude_service, get_media_type  # noqa: E402
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".gif")
+
+# Input price multipliers relative to uncached input tokens
+CACHE_WRITE_MULTIPLIER = 1.25
+CACHE_READ_MULTIPLIER = 0.1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("corpus", help="Directory of images to analyze")
+    parser.add_argument("--limit", type=int, default=20, help="Max images to analyze")
+    args = parser.parse_args()
+
+    paths = sorted(
+        os.path.join(args.corpus, name)
+        for name in os.listdir(args.corpus)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )[: args.limit]
+
+    totals = {
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "cache_creation_input_tokens": 0,
+        "cache_read_input_tokens": 0,
+    }
+    print(f"{'image':<32} {'input':>8} {'output':>8} {'c_write':>8} {'c_read':>8}")
+    for path in paths:
+        with open(path, "rb") as f:
+            image_data = base64.standard_b64encode(f.read()).decode("utf-8")
+        message = claude_service.client.messages.create(
+            **claude_service.build_message_params(image_data, get_media_type(path))
+        )
+        usage = claude_service.get_usage(message)
+        for key in totals:
+            totals[key] += usage[key]
+        print(
+            f"{os.path.basename(path)[:32]:<32} {usage['input_tokens']:>8} {usage['output_tokens']:>8} "
+            f"{usage['cache_creation_input_tokens']:>8} {usage['cache_read_input_tokens']:>8}"
+        )
+
+    uncached = (
+        totals["input_tokens"]
+        + totals["cache_creation_input_tokens"]
+        + totals["cache_read_input_tokens"]
+    )
+    effective = (
+        totals["input_tokens"]
+        + totals["cache_creation_input_tokens"] * CACHE_WRITE_MULTIPLIER
+        + totals["cache_read_input_tokens"] * CACHE_READ_MULTIPLIER
+    )
+    print(f"\nCalls: {len(paths)}")
+    for key, value in totals.items():
+        print(f"  {key:<28} {value:>10}")
+    if uncached:
+        print(f"  input cost vs. no caching:   {effective / uncached:>10.1%}")
+    if paths and not (totals["cache_creation_input_tokens"] or totals["cache_read_input_tokens"]):
+        print(
+            "\nWARNING: no prompt cache writes or reads were recorded. The cached "
+            "prefix is likely below the model's minimum cacheable length, so "
+            "caching is not taking effect."
+        )
+
+
+if __name__ == "__main__":
+    main()
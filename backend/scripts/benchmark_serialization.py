@@ -0,0 +1,152 @@
+"""
+Compare serialization cost and payload size for a page of photos.
+
+Builds a 50-photo page with full analyses and renders it the way a handler's
+return value is rendered, through FastAPI's own serialize_response:
+  - baseline: no response_model -> jsonable_encoder -> JSONResponse
+  - current:  PhotoListResponse response_model -> pydantic-core -> ORJSONResponse
+
+Analysis text is generated per photo from the word stream of stdlib
+docstrings, so payload sizes reflect distinct English text rather than one
+repeated paragraph (which gzip would collapse).
+
+Run from the backend directory:
+    python scripts/benchmark_serialization.py [--photos 50] [--iterations 200]
+"""
+import argparse
+import asyncio
+import gzip
+import inspect
+import os
+import random
+import re
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from schemas import PhotoListResponse  # noqa: E402
+
+GZIP_LEVELS = (1, 4, 6, 9)
+GZIP_ITERATIONS = 20
+
+# Roughly the size of real location and historical sections
+LOCATION_CHARS = 1800
+HISTORY_CHARS = 3400
+
+
+def load_words() -> list[str]:
+    """English words from stdlib docstrings, in their natural frequencies."""
+    words = []
+    for module in (argparse, asyncio, gzip, inspect, os, random, re, time, uuid):
+        for name in dir(module):
+            doc = inspect.getdoc(getattr(module, name, None))
+            if doc:
+                words.extend(re.findall(r"[A-Za-z]{2,}", doc))
+    return words
+
+
+def make_text(rng: random.Random, words: list[str], length: int) -> str:
+    """Markdown-ish paragraphs of random sentences, about length chars long."""
+    paragraphs = []
+    size = 0
+    while size < length:
+        sentences = []
+        for _ in range(rng.randint(2, 5)):
+            sentence = " ".join(rng.choice(words) for _ in range(rng.randint(8, 20)))
+            sentences.append(sentence[0].upper() + sentence[1:] + ".")
+        paragraph = " ".join(sentences)
+        if rng.random() < 0.3:
+            paragraph = f"- **{paragraph}**"
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+    return "\n\n".join(paragraphs)
+
+
+def build_page(count: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    words = load_words()
+    created_at = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc).isoformat()
+    photos = []
+    for _ in range(count):
+        photo_id = str(uuid.uuid4())
+        photos.append({
+            "id": photo_id,
+            "filename": f"user_123/{photo_id}.jpg",
+            "original_filename": "IMG_2041.jpg",
+            "storage_url": f"http://localhost:8000/uploads/user_123/{photo_id}.jpg",
+            "file_size": 3_482_113,
+            "created_at": created_at,
+            "analysis": {
+                "id": str(uuid.uuid4()),
+                "location_info": make_text(rng, words, LOCATION_CHARS),
+                "historical_context": make_text(rng, words, HISTORY_CHARS),
+                "user_context": "Summer trip, day 4",
+            },
+        })
+    return {"photos": photos, "count": len(photos)}
+
+
+# Same field FastAPI builds for `response_model=PhotoListResponse`
+RESPONSE_FIELD = create_model_field(
+    name="Response_list_photos", type_=PhotoListResponse, mode="serialization"
+)
+
+
+async def render_baseline(page: dict) -> bytes:
+    content = await serialize_response(response_content=page)
+    return JSONResponse(content=content).body
+
+
+async def render_current(page: dict) -> bytes:
+    content = await serialize_response(field=RESPONSE_FIELD, response_content=page)
+    return ORJSONResponse(content=content).body
+
+
+async def time_it(fn, page: dict, iterations: int) -> float:
+    start = time.process_time()
+    for _ in range(iterations):
+        await fn(page)
+    return (time.process_time() - start) / iterations * 1000
+
+
+async def run(photos: int, iterations: int):
+    page = build_page(photos)
+
+    baseline_ms = await time_it(render_baseline, page, iterations)
+    current_ms = await time_it(render_current, page, iterations)
+
+    body = await render_current(page)
+
+    print(f"Page: {photos} photos, {iterations} iterations")
+    print(f"  jsonable_encoder + JSONResponse: {baseline_ms:8.3f} ms CPU/page")
+    print(f"  response_model + ORJSONResponse: {current_ms:8.3f} ms CPU/page")
+    print(f"  speedup:                         {baseline_ms / current_ms:8.2f}x")
+    print(f"  bytes (identity):                {len(body):8d}")
+    for level in GZIP_LEVELS:
+        start = time.process_time()
+        for _ in range(GZIP_ITERATIONS):
+            compressed = gzip.compress(body, compresslevel=level)
+        gzip_ms = (time.process_time() - start) / GZIP_ITERATIONS * 1000
+        print(
+            f"  bytes (gzip level {level}):          {len(compressed):8d}"
+            f"  ({len(body) / len(compressed):.2f}x, {gzip_ms:.1f} ms CPU)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--photos", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.photos, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
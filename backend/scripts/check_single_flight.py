@@ -0,0 +1,98 @@
+"""
+Check that concurrent analyze requests for one photo share a single model call.
+
+Fires N simultaneous POST /api/photos/{id}/analyze requests at the app
+(in-process, against a throwaway SQLite database) with the Claude call
+replaced by a slow counting stub, then asserts exactly one upstream call
+and one analyses row.
+
+Run from the backend directory:
+    python scripts/check_single_flight.py [--requests 50]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Never touch the configured database or API
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'single_flight.db')}"
+os.environ.setdefault("ANTHROPIC_API_KEY", "unused")
+os.environ.setdefault("CLERK_SECRET_KEY", "unused")
+os.environ.setdefault("CLERK_PUBLISHABLE_KEY", "pk_test_unused")
+
+import httpx  # noqa: E402
+from main import app  # noqa: E402
+from database import Base, SessionLocal, engine  # noqa: E402
+from models import User, Photo, Analysis  # noqa: E402
+from services.auth_service import get_current_user  # noqa: E402
+from services.claude_service import claude_service  # noqa: E402
+
+upstream_calls = 0
+
+
+async def fake_analyze_photo(image_url: str, user_context: str | None = None) -> dict:
+    global upstream_calls
+    upstream_calls += 1
+    await asyncio.sleep(0.5)
+    return {
+        "location_info": "Pont du Gard, France",
+        "historical_context": "Roman aqueduct bridge.",
+        "full_response": "## Location\nPont du Gard, France",
+        "usage": {
+            "input_tokens": 1,
+            "output_tokens": 1,
+            "cache_creation_input_tokens": 0,
+            "cache_read_input_tokens": 0,
+        },
+    }
+
+
+async def run(count: int):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = User(id="user_single_flight")
+    photo = Photo(
+        user_id=user.id,
+        filename="user_single_flight/photo.jpg",
+        original_filename="photo.jpg",
+        storage_url="http://localhost/photo.jpg",
+    )
+    db.add_all([user, photo])
+    db.commit()
+    photo_id = photo.id
+    db.close()
+
+    claude_service.analyze_photo = fake_analyze_photo
+    app.dependency_overrides[get_current_user] = lambda: User(id="user_single_flight")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        responses = await asyncio.gather(*(
+            client.post(f"/api/photos/{photo_id}/analyze") for _ in range(count)
+        ))
+
+    statuses = {r.status_code for r in responses}
+    db = SessionLocal()
+    rows = db.query(Analysis).filter(Analysis.photo_id == photo_id).count()
+    db.close()
+
+    print(f"Requests: {count}, statuses: {sorted(statuses)}, upstream calls: {upstream_calls}, rows: {rows}")
+    assert statuses == {200}, "some requests failed"
+    assert upstream_calls == 1, "expected exactly one upstream call"
+    assert rows == 1, "expected exactly one analyses row"
+    print("OK")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests))
+
+
+if __name__ == "__main__":
+    main()
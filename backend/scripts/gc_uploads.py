@@ -0,0 +1,84 @@
+"""
+Garbage-collect orphaned upload files.
+
+First retries files queued for deletion (file_deletions), then streams every
+file under uploads/<user_id>/ and removes those with no matching
+photos.filename row, e.g. files left by a crash between the upload write and
+the database commit. Files are checked against the database in batches, and
+files newer than --min-age are skipped so in-progress uploads are never
+touched.
+
+Run from the backend directory:
+    python scripts/gc_uploads.py [--dry-run] [--min-age 3600]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import SessionLocal  # noqa: E402
+from models import Photo  # noqa: E402
+from services.storage_service import storage_service  # noqa: E402
+
+
+def find_orphans(batch: list[tuple[str, int]]) -> list[tuple[str, int]]:
+    """Return the files in batch that no photo row references."""
+    db = SessionLocal()
+    try:
+        filenames = [filename for filename, _ in batch]
+        known = {
+            filename
+            for (filename,) in db.query(Photo.filename).filter(Photo.filename.in_(filenames))
+        }
+    finally:
+        db.close()
+    return [(filename, size) for filename, size in batch if filename not in known]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--batch-size", type=int, default=1000, help="Files checked per DB query")
+    parser.add_argument("--min-age", type=float, default=3600, help="Skip files modified within this many seconds")
+    parser.add_argument("--dry-run", action="store_true", help="Report orphans without deleting them")
+    args = parser.parse_args()
+
+    if not args.dry_run:
+        removed, reclaimed_bytes = storage_service.reclaim_deletions()
+        print(f"Queued deletions: {removed} files, {reclaimed_bytes} bytes reclaimed")
+
+    cutoff = time.time() - args.min_age
+    scanned = orphans = failed = reclaimed_bytes = 0
+    batch: list[tuple[str, int]] = []
+
+    def flush():
+        nonlocal orphans, failed, reclaimed_bytes
+        for filename, size in find_orphans(batch):
+            orphans += 1
+            if args.dry_run:
+                reclaimed_bytes += size
+                continue
+            try:
+                reclaimed_bytes += storage_service.delete_file(filename)
+            except OSError as e:
+                failed += 1
+                print(f"Failed to delete {filename}: {e}")
+        batch.clear()
+
+    for filename, size, mtime in storage_service.iter_files():
+        scanned += 1
+        if mtime > cutoff:
+            continue
+        batch.append((filename, size))
+        if len(batch) >= args.batch_size:
+            flush()
+    if batch:
+        flush()
+
+    verb = "would be reclaimed" if args.dry_run else "reclaimed"
+    print(f"Scanned {scanned} files: {orphans} orphans, {failed} failed, {reclaimed_bytes} bytes {verb}")
+
+
+if __name__ == "__main__":
+    main()
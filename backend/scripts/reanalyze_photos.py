@@ -0,0 +1,315 @@
+"""
+Re-analyze existing photos through the Anthropic Message Batches API.
+
+Streams photos that already have an analysis in id order, submits them in
+chunks as message batches (half the price of live calls), polls until each
+batch ends and bulk-writes the results back into `analyses`.
+
+Progress is checkpointed to a JSON file around every submission and every
+completed batch, so re-running the same command resumes where it stopped:
+a submission interrupted mid-request adopts the batch it created (matched
+via the batches list) instead of paying for the chunk twice, in-flight
+batches are collected next, then streaming continues after the last
+submitted photo. Collecting a batch twice is harmless: analyses are
+overwritten with the same results and usage rows have deterministic ids.
+Delete the checkpoint file to start a fresh run.
+
+Set ANTHROPIC_BASE_URL (or pass --base-url) to run against a local fake API.
+
+Run from the backend directory:
+    python scripts/reanalyze_photos.py [--checkpoint reanalyze.json]
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+import uuid
+from typing import Iterator, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import bindparam, update  # noqa: E402
+from database import SessionLocal, upsert  # noqa: E402
+from models import Photo, Analysis, AnalysisUsage  # noqa: E402
+from services.claude_service import IncompleteAnalysisError, claude_service, get_media_type  # noqa: E402
+from services.storage_service import storage_service  # noqa: E402
+
+# The API accepts up to 100,000 requests or 256 MB per batch
+MAX_BATCH_REQUESTS = 100_000
+MAX_BATCH_BYTES = 256 * 1024 * 1024
+
+# Tolerance between the local clock and the API's batch created_at
+CLOCK_SKEW_SECONDS = 300
+
+
+class Checkpoint:
+    """Resumable job state persisted as JSON."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.cursor: Optional[str] = None  # Last photo id submitted in a batch
+        self.pending: list[str] = []  # Batch ids submitted but not yet collected
+        self.updated = 0
+        self.failed: list[str] = []
+        # Chunk being submitted: first/last photo id, request count, start time
+        self.submitting: Optional[dict] = None
+
+        if os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            self.cursor = state["cursor"]
+            self.pending = state["pending"]
+            self.updated = state["updated"]
+            self.failed = state["failed"]
+            self.submitting = state.get("submitting")
+
+    def save(self):
+        # Write to a temp file and rename so a crash never leaves a torn file
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "cursor": self.cursor,
+                "pending": self.pending,
+                "updated": self.updated,
+                "failed": self.failed,
+                "submitting": self.submitting,
+            }, f)
+        os.replace(tmp_path, self.path)
+
+
+class ReanalysisJob:
+    def __init__(
+        self,
+        checkpoint: Checkpoint,
+        page_size: int = 500,
+        chunk_size: int = 1000,
+        max_batch_bytes: int = 100 * 1024 * 1024,
+        max_in_flight: int = 4,
+        poll_interval: float = 60,
+    ):
+        self.checkpoint = checkpoint
+        self.page_size = page_size
+        self.chunk_size = min(chunk_size, MAX_BATCH_REQUESTS)
+        self.max_batch_bytes = min(max_batch_bytes, MAX_BATCH_BYTES)
+        self.max_in_flight = max_in_flight
+        self.poll_interval = poll_interval
+        self.batches = claude_service.client.beta.messages.batches
+
+    def run(self):
+        # Recover a submission a previous run crashed in, then collect the
+        # batches it left in flight
+        if self.checkpoint.submitting:
+            self._recover_submission()
+        while self.checkpoint.pending:
+            self._collect(self.checkpoint.pending[0])
+
+        requests: list[dict] = []
+        chunk_bytes = 0
+
+        for photo_id, filename, user_context in self._stream_photos():
+            request = self._build_request(photo_id, filename, user_context)
+            if request is None:
+                continue
+            request_bytes = len(request["params"]["messages"][0]["content"][0]["source"]["data"])
+
+            if requests and (
+                len(requests) >= self.chunk_size
+                or chunk_bytes + request_bytes > self.max_batch_bytes
+            ):
+                self._submit(requests)
+                requests, chunk_bytes = [], 0
+
+            requests.append(request)
+            chunk_bytes += request_bytes
+
+        if requests:
+            self._submit(requests)
+
+        while self.checkpoint.pending:
+            self._collect(self.checkpoint.pending[0])
+
+        print(f"Done: {self.checkpoint.updated} analyses updated, {len(self.checkpoint.failed)} failed")
+
+    def _stream_photos(self) -> Iterator[tuple[str, str, Optional[str]]]:
+        """Yield (photo_id, filename, user_context) using keyset pagination."""
+        cursor = self.checkpoint.cursor
+        while True:
+            db = SessionLocal()
+            try:
+                query = (
+                    db.query(Photo.id, Photo.filename, Analysis.user_context)
+                    .join(Analysis, Analysis.photo_id == Photo.id)
+                    .order_by(Photo.id)
+                )
+                if cursor is not None:
+                    query = query.filter(Photo.id > cursor)
+                rows = query.limit(self.page_size).all()
+            finally:
+                db.close()
+
+            if not rows:
+                return
+            yield from rows
+            cursor = rows[-1][0]
+
+    def _build_request(
+        self, photo_id: str, filename: str, user_context: Optional[str]
+    ) -> Optional[dict]:
+        file_path = storage_service.get_file_path(filename)
+        try:
+            with open(file_path, "rb") as f:
+                image_data = base64.standard_b64encode(f.read()).decode("utf-8")
+        except OSError as e:
+            print(f"Skipping {photo_id}: {e}")
+            self.checkpoint.failed.append(photo_id)
+            return None
+
+        return {
+            "custom_id": photo_id,
+            "params": claude_service.build_message_params(
+                image_data, get_media_type(filename), user_context
+            ),
+        }
+
+    def _submit(self, requests: list[dict]):
+        if len(self.checkpoint.pending) >= self.max_in_flight:
+            self._collect(self.checkpoint.pending[0])
+
+        # Record the chunk before creating the batch, so a crash before its id
+        # is saved can be recovered by adopting the batch
+        self.checkpoint.submitting = {
+            "first_photo_id": requests[0]["custom_id"],
+            "last_photo_id": requests[-1]["custom_id"],
+            "count": len(requests),
+            "started_at": time.time(),
+        }
+        self.checkpoint.save()
+
+        batch = self.batches.create(requests=requests)
+        print(f"Submitted batch {batch.id} with {len(requests)} requests")
+        self._adopt(batch.id)
+
+    def _adopt(self, batch_id: str):
+        self.checkpoint.pending.append(batch_id)
+        self.checkpoint.cursor = self.checkpoint.submitting["last_photo_id"]
+        self.checkpoint.submitting = None
+        self.checkpoint.save()
+
+    def _recover_submission(self):
+        """Adopt the batch created by an interrupted submission, if any."""
+        submitting = self.checkpoint.submitting
+        earliest = submitting["started_at"] - CLOCK_SKEW_SECONDS
+
+        # The list is newest first; the earliest batch created after the
+        # submission started with the same request count is ours
+        match = None
+        for batch in self.batches.list(limit=100):
+            if batch.created_at.timestamp() < earliest:
+                break
+            counts = batch.request_counts
+            total = (
+                counts.processing + counts.succeeded + counts.errored
+                + counts.canceled + counts.expired
+            )
+            if total == submitting["count"] and batch.id not in self.checkpoint.pending:
+                match = batch
+
+        if match is not None:
+            print(
+                f"Adopting batch {match.id} for photos "
+                f"{submitting['first_photo_id']}..{submitting['last_photo_id']}"
+            )
+            self._adopt(match.id)
+        else:
+            # Never created: the cursor was not advanced, so the chunk is
+            # rebuilt and submitted again
+            self.checkpoint.submitting = None
+            self.checkpoint.save()
+
+    def _collect(self, batch_id: str):
+        """Wait for a batch to end, then write its results to the database."""
+        batch = self.batches.retrieve(batch_id)
+        while batch.processing_status != "ended":
+            time.sleep(self.poll_interval)
+            batch = self.batches.retrieve(batch_id)
+
+        rows = []
+        usage_rows = []
+        for entry in self.batches.results(batch_id):
+            if entry.result.type != "succeeded":
+                self.checkpoint.failed.append(entry.custom_id)
+                continue
+            try:
+                parsed = claude_service.parse_message(entry.result.message)
+            except IncompleteAnalysisError as e:
+                # Never overwrite a good analysis with a truncated one
+                print(f"Skipping {entry.custom_id}: {e}")
+                self.checkpoint.failed.append(entry.custom_id)
+                continue
+            usage_rows.append({
+                # Deterministic so re-collecting after a crash adds no duplicates
+                "id": str(uuid.uuid5(uuid.NAMESPACE_URL, f"{batch_id}/{entry.custom_id}")),
+                "photo_id": entry.custom_id,
+                "model": claude_service.model,
+                **parsed.pop("usage"),
+            })
+            rows.append({"b_photo_id": entry.custom_id, **parsed})
+
+        if rows:
+            db = SessionLocal()
+            try:
+                # Core executemany: one UPDATE statement for the whole batch
+                analyses = Analysis.__table__
+                db.execute(
+                    update(analyses)
+                    .where(analyses.c.photo_id == bindparam("b_photo_id"))
+                    .values(
+                        location_info=bindparam("location_info"),
+                        historical_context=bindparam("historical_context"),
+                        full_response=bindparam("full_response"),
+                    ),
+                    rows,
+                )
+                db.execute(
+                    upsert(AnalysisUsage).on_conflict_do_nothing(index_elements=[AnalysisUsage.id]),
+                    usage_rows,
+                )
+                db.commit()
+            finally:
+                db.close()
+
+        print(f"Collected batch {batch_id}: {len(rows)} succeeded")
+        self.checkpoint.updated += len(rows)
+        self.checkpoint.pending.remove(batch_id)
+        self.checkpoint.save()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--checkpoint", default="reanalyze_checkpoint.json")
+    parser.add_argument("--page-size", type=int, default=500, help="Photos fetched per DB query")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Max requests per batch")
+    parser.add_argument("--max-batch-mb", type=int, default=100, help="Max payload size per batch")
+    parser.add_argument("--max-in-flight", type=int, default=4, help="Batches processing at once")
+    parser.add_argument("--poll-interval", type=float, default=60, help="Seconds between status checks")
+    parser.add_argument("--base-url", help="Anthropic API base URL (e.g. a local fake)")
+    args = parser.parse_args()
+
+    if args.base_url:
+        claude_service.client = claude_service.client.with_options(base_url=args.base_url)
+
+    job = ReanalysisJob(
+        Checkpoint(args.checkpoint),
+        page_size=args.page_size,
+        chunk_size=args.chunk_size,
+        max_batch_bytes=args.max_batch_mb * 1024 * 1024,
+        max_in_flight=args.max_in_flight,
+        poll_interval=args.poll_interval,
+    )
+    job.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,7 @@ import jwt
 from jwt import PyJWKClient
 from config import get_settings
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_db, upsert
 from models import User
 
 settings = get_settings()
@@ -62,15 +62,15 @@ async def get_current_user(
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token payload")
 
-    # Get or create user
+    # Get or create user (ON CONFLICT so concurrent first requests don't collide)
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
-        user = User(
-            id=user_id,
-            email=payload.get("email"),
+        db.execute(
+            upsert(User)
+            .values(id=user_id, email=payload.get("email"))
+            .on_conflict_do_nothing(index_elements=[User.id])
         )
-        db.add(user)
         db.commit()
-        db.refresh(user)
+        user = db.query(User).filter(User.id == user_id).one()
 
     return user
@@ -5,66 +5,124 @@ from config import get_settings
 
 settings = get_settings()
 
+# Static instructions live in the system prompt, the only part of the request
+# that is identical across calls, so it is the prompt-cache candidate (see the
+# cache_control note in build_message_params).
+SYSTEM_PROMPT = """You analyze travel photos and provide helpful information for someone trying to remember where a photo was taken and what they were looking at.
+
+Record your analysis with the record_analysis tool, writing each field in Markdown.
+
+For location_info, identify the location shown in the photo. Include:
+- Specific landmark, building, or place name (if identifiable)
+- City and country
+- Any notable geographic features
+- If you cannot identify the exact location, describe what you can see and suggest possible locations
+
+For historical_context, provide interesting historical and cultural information about this location:
+- Brief history of the landmark or area
+- Cultural significance
+- Interesting facts a visitor might want to know
+- Any notable events that occurred here
+
+If the user provides additional context about the photo, use it to help inform your analysis, but verify what you can see in the image.
+
+If you cannot identify the location with certainty, be honest about that and provide your best assessment based on visual clues like architecture style, landscape, signage, or other contextual elements."""
+
+ANALYSIS_TOOL = {
+    "name": "record_analysis",
+    "description": "Record the location and historical analysis of a travel photo.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "location_info": {
+                "type": "string",
+                "description": "Markdown description of the identified location.",
+            },
+            "historical_context": {
+                "type": "string",
+                "description": "Markdown historical and cultural context for the location.",
+            },
+        },
+        "required": ["location_info", "historical_context"],
+    },
+}
+
+
+class IncompleteAnalysisError(Exception):
+    """Claude's reply was truncated or missing a required analysis field."""
+
+
+def get_media_type(path: str) -> str:
+    """Determine the image media type from a file name or URL."""
+    path = path.lower()
+    if path.endswith(".png"):
+        return "image/png"
+    elif path.endswith(".webp"):
+        return "image/webp"
+    elif path.endswith(".gif"):
+        return "image/gif"
+    return "image/jpeg"
+
 
 class ClaudeService:
     def __init__(self):
-        self.client = anthropic.Anthropic(api_key=settings.anthropic_api_key)
+        self.client = anthropic.Anthropic(
+            api_key=settings.anthropic_api_key,
+            base_url=settings.anthropic_base_url,
+        )
         self.model = "claude-sonnet-4-20250514"
 
     async def analyze_photo(self, image_url: str, user_context: str | None = None) -> dict:
         """
         Analyze a photo using Claude's vision capabilities.
-        Returns location identification and historical context.
+        Returns location identification, historical context and token usage.
         """
         # Download image and convert to base64
         async with httpx.AsyncClient() as http_client:
             response = await http_client.get(image_url)
             image_data = base64.standard_b64encode(response.content).decode("utf-8")
 
-        # Determine media type from URL
-        media_type = "image/jpeg"
-        if image_url.lower().endswith(".png"):
-            media_type = "image/png"
-        elif image_url.lower().endswith(".webp"):
-            media_type = "image/webp"
-        elif image_url.lower().endswith(".gif"):
-            media_type = "image/gif"
-
-        # Build the prompt
-        context_section = ""
-        if user_context:
-            context_section = f"""
-The user has provided this additional context about the photo:
-"{user_context}"
-
-Use this context to help inform your analysis, but verify what you can see in the image.
-"""
-
-        prompt = f"""Analyze this travel photo and provide helpful information for someone trying to remember where it was taken and what they were looking at.
-{context_section}
-Please provide your analysis in the following format:
-
-## Location
-Identify the location shown in this photo. Include:
-- Specific landmark, building, or place name (if identifiable)
-- City and country
-- Any notable geographic features
-- If you cannot identify the exact location, describe what you can see and suggest possible locations
+        # Call Claude API
+        message = self.client.messages.create(
+            **self.build_message_params(image_data, get_media_type(image_url), user_context)
+        )
 
-## Historical & Cultural Context
-Provide interesting historical and cultural information about this location:
-- Brief history of the landmark or area
-- Cultural significance
-- Interesting facts a visitor might want to know
-- Any notable events that occurred here
+        return self.parse_message(message)
 
-If you cannot identify the location with certainty, be honest about that and provide your best assessment based on visual clues like architecture style, landscape, signage, or other contextual elements."""
+    def build_message_params(
+        self, image_data: str, media_type: str, user_context: str | None = None
+    ) -> dict:
+        """
+        Build the Messages API parameters for analyzing one base64-encoded image.
+        Shared by live analysis and Message Batches requests.
+        """
+        prompt = "Analyze this travel photo."
+        if user_context:
+            prompt += (
+                "\n\nThe user has provided this additional context about the photo:\n"
+                f'"{user_context}"'
+            )
 
-        # Call Claude API
-        message = self.client.messages.create(
-            model=self.model,
-            max_tokens=1500,
-            messages=[
+        return {
+            "model": self.model,
+            # Tool input is JSON-escaped Markdown, which costs more tokens than prose
+            "max_tokens": 4096,
+            # The breakpoint marks the tool definition and system prompt as the
+            # cacheable prefix. At ~700 tokens that prefix is below the
+            # 1024-token minimum for claude-sonnet-4, so the API currently
+            # ignores it and every call is billed uncached. It only takes
+            # effect once the static instructions grow past the minimum
+            # (check with scripts/benchmark_prompt_cache.py).
+            "system": [
+                {
+                    "type": "text",
+                    "text": SYSTEM_PROMPT,
+                    "cache_control": {"type": "ephemeral"},
+                }
+            ],
+            "tools": [ANALYSIS_TOOL],
+            "tool_choice": {"type": "tool", "name": ANALYSIS_TOOL["name"]},
+            "messages": [
                 {
                     "role": "user",
                     "content": [
@@ -83,11 +141,48 @@ If you cannot identify the location with certainty, be honest about that and pro
                     ],
                 }
             ],
-        )
-
-        # Parse response
-        full_response = message.content[0].text
+        }
 
+    def parse_message(self, message) -> dict:
+        """
+        Extract the Analysis fields and token usage from a Claude message.
+        Raises IncompleteAnalysisError rather than returning empty fields.
+        """
+        if message.stop_reason == "max_tokens":
+            raise IncompleteAnalysisError("Response was truncated at max_tokens")
+
+        analysis = None
+        for block in message.content:
+            if block.type == "tool_use" and block.name == ANALYSIS_TOOL["name"]:
+                analysis = block.input
+                break
+
+        if analysis is not None:
+            location_info = analysis.get("location_info", "")
+            historical_context = analysis.get("historical_context", "")
+            result = {
+                "location_info": location_info,
+                "historical_context": historical_context,
+                "full_response": (
+                    f"## Location\n{location_info}\n\n"
+                    f"## Historical & Cultural Context\n{historical_context}"
+                ),
+            }
+        else:
+            # Fall back to the plain-text format if the model answered in prose
+            text = "".join(block.text for block in message.content if block.type == "text")
+            result = self.parse_response(text)
+
+        for field in ("location_info", "historical_context"):
+            value = result[field]
+            if not isinstance(value, str) or not value.strip():
+                raise IncompleteAnalysisError(f"Response is missing {field}")
+
+        result["usage"] = self.get_usage(message)
+        return result
+
+    def parse_response(self, full_response: str) -> dict:
+        """Split a Markdown Claude response into the Analysis fields."""
         # Extract sections
         location_info = ""
         historical_context = ""
@@ -104,6 +199,16 @@ If you cannot identify the location with certainty, be honest about that and pro
             "full_response": full_response,
         }
 
+    def get_usage(self, message) -> dict:
+        """Token usage for a message, including prompt cache reads and writes."""
+        usage = message.usage
+        return {
+            "input_tokens": usage.input_tokens,
+            "output_tokens": usage.output_tokens,
+            "cache_creation_input_tokens": getattr(usage, "cache_creation_input_tokens", None) or 0,
+            "cache_read_input_tokens": getattr(usage, "cache_read_input_tokens", None) or 0,
+        }
+
 
 # Singleton instance
 claude_service = ClaudeService()
@@ -1,10 +1,15 @@
+import logging
 import os
 import uuid
 import aiofiles
+from typing import Iterator
 from fastapi import UploadFile
 from config import get_settings
+from database import SessionLocal
+from models import FileDeletion
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
 
 class StorageService:
@@ -52,15 +57,74 @@ class StorageService:
             "mime_type": file.content_type,
         }
 
-    def delete_file(self, filename: str) -> bool:
-        """Delete a file from local storage."""
+    def delete_file(self, filename: str) -> int:
+        """
+        Delete a file from local storage and return the bytes reclaimed.
+        A missing file counts as deleted; other OS errors are raised.
+        """
+        file_path = os.path.join(self.storage_dir, filename)
         try:
-            file_path = os.path.join(self.storage_dir, filename)
-            if os.path.exists(file_path):
-                os.remove(file_path)
-            return True
-        except Exception:
-            return False
+            size = os.stat(file_path).st_size
+            os.remove(file_path)
+        except FileNotFoundError:
+            return 0
+        return size
+
+    def reclaim_deletions(
+        self, deletion_ids: list[str] | None = None, batch_size: int = 500
+    ) -> tuple[int, int]:
+        """
+        Remove files queued in file_deletions (all of them if no ids are given).
+        Failed removals stay queued with the error recorded for the next run.
+        Returns (files removed, bytes reclaimed).
+        """
+        removed = 0
+        reclaimed_bytes = 0
+        cursor = ""
+
+        while True:
+            db = SessionLocal()
+            try:
+                query = db.query(FileDeletion).filter(FileDeletion.id > cursor).order_by(FileDeletion.id)
+                if deletion_ids is not None:
+                    query = query.filter(FileDeletion.id.in_(deletion_ids))
+                deletions = query.limit(batch_size).all()
+                if not deletions:
+                    break
+
+                for deletion in deletions:
+                    try:
+                        reclaimed_bytes += self.delete_file(deletion.filename)
+                    except OSError as e:
+                        logger.warning("Failed to delete %s: %s", deletion.filename, e)
+                        deletion.attempts += 1
+                        deletion.last_error = str(e)
+                        continue
+                    db.delete(deletion)
+                    removed += 1
+
+                cursor = deletions[-1].id
+                db.commit()
+            finally:
+                db.close()
+
+        return removed, reclaimed_bytes
+
+    def iter_files(self) -> Iterator[tuple[str, int, float]]:
+        """
+        Stream (filename, size, mtime) for every file under uploads/<user_id>/.
+        Uses os.scandir so directories are never listed into memory at once.
+        """
+        with os.scandir(self.storage_dir) as user_dirs:
+            for user_dir in user_dirs:
+                if not user_dir.is_dir(follow_symlinks=False):
+                    continue
+                with os.scandir(user_dir.path) as entries:
+                    for entry in entries:
+                        if not entry.is_file(follow_symlinks=False):
+                            continue
+                        stat = entry.stat(follow_symlinks=False)
+                        yield f"{user_dir.name}/{entry.name}", stat.st_size, stat.st_mtime
 
     def get_file_path(self, filename: str) -> str:
         """Get the full file path for a file."""